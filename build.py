@@ -7,19 +7,19 @@ Tampermonkey脚本到浏览器插件转换工具
 import sys
 import argparse
 import logging
+import os
+import shutil
 from pathlib import Path
+from typing import Union
 
 # 添加src到Python路径
 SCRIPT_DIR = Path(__file__).parent
 sys.path.insert(0, str(SCRIPT_DIR))
 
-from src.parser import UserScriptParser, UserScriptMetadata
-from src.manifest import ManifestV3Generator
-from src.converter import CodeConverter
-from src.fetcher import DependencyFetcher
-from src.validator import validate_store_readiness, validate_store_assets
-from src.packager import load_upload_config, package_extension, open_upload_pages
-from utils.image import generate_icon_sizes
+# UserScript元数据块标记（位于文件开头，只需读取头部即可判断）
+USERSCRIPT_START = b"// ==UserScript=="
+USERSCRIPT_END = b"// ==/UserScript=="
+HEADER_SNIFF_SIZE = 4096
 
 
 def setup_logging(verbose: bool = False):
@@ -32,14 +32,33 @@ def setup_logging(verbose: bool = False):
     )
 
 
+def is_userscript_file(js_file: Union[str, Path]) -> bool:
+    """读取文件头部，判断是否包含UserScript元数据块"""
+    with open(js_file, "rb") as f:
+        # 多读取起始标记长度-1字节，避免标记恰好跨越头部边界被截断
+        head = f.read(HEADER_SNIFF_SIZE + len(USERSCRIPT_START) - 1)
+        if USERSCRIPT_START not in head:
+            return False
+        if USERSCRIPT_END in head:
+            return True
+        # 元数据块超出头部范围时一次性读取剩余内容，保留重叠部分以防结束标记跨越边界
+        rest = head[-(len(USERSCRIPT_END) - 1):] + f.read()
+        return USERSCRIPT_END in rest
+
+
 def find_script_file(script_dir: Path) -> Path:
     """扫描目录下所有.js文件，找到包含UserScript特征的那个"""
     candidates = []
 
-    for js_file in script_dir.glob("*.js"):
+    # 使用scandir一次性获取文件类型，避免逐个stat
+    with os.scandir(script_dir) as entries:
+        js_files = [
+            entry for entry in entries if entry.name.endswith(".js") and entry.is_file()
+        ]
+
+    for js_file in js_files:
         try:
-            content = js_file.read_text(encoding="utf-8")
-            if "// ==UserScript==" in content and "// ==/UserScript==" in content:
+            if is_userscript_file(js_file.path):
                 candidates.append(js_file)
         except Exception:
             pass
@@ -53,7 +72,7 @@ def find_script_file(script_dir: Path) -> Path:
             f"Please specify which one to use. Found: {names}"
         )
 
-    return candidates[0]
+    return Path(candidates[0].path)
 
 
 def build_script(
@@ -71,6 +90,16 @@ def build_script(
     Returns:
         bool: 是否构建成功
     """
+    # 延迟导入：避免 --help 等场景加载 requests、PIL 等重依赖
+    from src.parser import UserScriptParser
+    from src.manifest import ManifestV3Generator
+    from src.converter import CodeConverter
+    from src.fetcher import DependencyFetcher
+    from src.validator import validate_store_readiness, validate_store_assets
+    from src.packager import load_upload_config, package_extension, open_upload_pages
+    from utils.assets import scan_store_assets
+    from utils.image import generate_icon_sizes
+
     logger = logging.getLogger(__name__)
 
     try:
@@ -90,22 +119,14 @@ def build_script(
         output_dir = script_dir / "extension"
         if clean and output_dir.exists():
             # 清理输出目录
-            for item in output_dir.iterdir():
-                if item.is_file():
-                    item.unlink()
-                elif item.is_dir():
-                    for sub in item.rglob("*"):
-                        if sub.is_file():
-                            sub.unlink()
-                    for sub in sorted(output_dir.rglob("*"), reverse=True):
-                        if sub.is_dir():
-                            sub.rmdir()
+            shutil.rmtree(output_dir)
             logger.info("Cleaned output directory")
 
         output_dir.mkdir(parents=True, exist_ok=True)
 
         # 验证Chrome Web Store上架材料
-        assets_info = validate_store_assets(script_dir)
+        store_assets = scan_store_assets(script_dir)
+        assets_info = validate_store_assets(script_dir, store_assets)
         logger.info(
             f"Validated store assets: {assets_info['screenshot_count']} screenshot(s)"
         )
@@ -132,7 +153,7 @@ def build_script(
         logger.info(f"Generated: {content_path}")
 
         # 生成图标
-        icon_source = script_dir / "store_assets" / "icon.png"
+        icon_source = store_assets["icon"]
         icons_dir = output_dir / "icons"
         if not generate_icon_sizes(icon_source, icons_dir):
             raise RuntimeError("Icon generation failed. Check if icon.png is valid.")
@@ -160,7 +181,7 @@ def build_script(
 
             # 打包extension目录
             zip_path = package_extension(
-                output_dir, script_path.name, config, script_dir
+                output_dir, script_path.name, config, script_dir, store_assets
             )
 
             if zip_path and config:
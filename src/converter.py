@@ -3,61 +3,28 @@
 处理UserScript代码，注入GM API polyfill
 """
 
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Dict, Tuple
 from .parser import UserScriptMetadata
+from utils.fileio import atomic_write_bytes
 
 
 class CodeConverter:
     """脚本代码转换器"""
 
-    def __init__(self, metadata: UserScriptMetadata):
-        self.metadata = metadata
-
-    def convert(self, code_body: str) -> str:
-        """转换脚本代码，添加必要的polyfill"""
-        parts = []
-
-        # 1. 添加GM API polyfill（如果需要）
-        if self.metadata.uses_gm_api():
-            polyfill = self._generate_polyfill()
-            if polyfill:
-                parts.append(polyfill)
-
-        # 2. 添加原始代码
-        parts.append(code_body)
-
-        return '\n\n'.join(parts)
-
-    def _generate_polyfill(self) -> str:
-        """生成GM API polyfill代码"""
-        needed_apis = self.metadata.get_required_apis()
-
-        if not needed_apis:
-            return ''
-
-        # 构建polyfill代码
-        polyfill_parts = [
-            '// ===== GM API Polyfill for Browser Extensions =====',
-            '(function() {',
-            '    "use strict";',
-            ''
-        ]
-
-        # 为每个需要的API生成polyfill
-        for api in needed_apis:
-            api_polyfill = self._get_api_polyfill(api)
-            if api_polyfill:
-                polyfill_parts.append(api_polyfill)
-
-        polyfill_parts.append('})();')
-
-        return '\n'.join(polyfill_parts)
-
-    def _get_api_polyfill(self, api: str) -> str:
-        """获取特定API的polyfill代码"""
-        polyfills = {
-            'GM_addStyle': '''    // GM_addStyle polyfill
+    # polyfill包装代码
+    POLYFILL_HEADER = (
+        '// ===== GM API Polyfill for Browser Extensions =====\n'
+        '(function() {\n'
+        '    "use strict";\n'
+        '\n'
+    )
+    POLYFILL_FOOTER = '})();'
+
+    # GM API polyfill代码
+    POLYFILLS: Dict[str, str] = {
+        'GM_addStyle': '''    // GM_addStyle polyfill
     if (typeof GM_addStyle === 'undefined') {
         window.GM_addStyle = function(css) {
             const style = document.createElement('style');
@@ -67,7 +34,7 @@ class CodeConverter:
         };
     }''',
 
-            'GM.setValue': '''    // GM.setValue polyfill
+        'GM.setValue': '''    // GM.setValue polyfill
     if (typeof GM === 'undefined' || !GM.setValue) {
         window.GM = window.GM || {};
         GM.setValue = async function(key, value) {
@@ -77,7 +44,7 @@ class CodeConverter:
         };
     }''',
 
-            'GM.getValue': '''    // GM.getValue polyfill
+        'GM.getValue': '''    // GM.getValue polyfill
     if (typeof GM === 'undefined' || !GM.getValue) {
         window.GM = window.GM || {};
         GM.getValue = async function(key, defaultValue) {
@@ -89,7 +56,7 @@ class CodeConverter:
         };
     }''',
 
-            'GM.deleteValue': '''    // GM.deleteValue polyfill
+        'GM.deleteValue': '''    // GM.deleteValue polyfill
     if (typeof GM === 'undefined' || !GM.deleteValue) {
         window.GM = window.GM || {};
         GM.deleteValue = async function(key) {
@@ -99,7 +66,7 @@ class CodeConverter:
         };
     }''',
 
-            'GM.listValues': '''    // GM.listValues polyfill
+        'GM.listValues': '''    // GM.listValues polyfill
     if (typeof GM === 'undefined' || !GM.listValues) {
         window.GM = window.GM || {};
         GM.listValues = async function() {
@@ -111,7 +78,7 @@ class CodeConverter:
         };
     }''',
 
-            'GM.xmlHttpRequest': '''    // GM.xmlHttpRequest polyfill
+        'GM.xmlHttpRequest': '''    // GM.xmlHttpRequest polyfill
     if (typeof GM === 'undefined' || !GM.xmlHttpRequest) {
         window.GM = window.GM || {};
         GM.xmlHttpRequest = function(details) {
@@ -136,7 +103,7 @@ class CodeConverter:
         };
     }''',
 
-            'GM.notification': '''    // GM.notification polyfill
+        'GM.notification': '''    // GM.notification polyfill
     if (typeof GM === 'undefined' || !GM.notification) {
         window.GM = window.GM || {};
         GM.notification = function(options) {
@@ -149,7 +116,7 @@ class CodeConverter:
         };
     }''',
 
-            'GM.setClipboard': '''    // GM.setClipboard polyfill
+        'GM.setClipboard': '''    // GM.setClipboard polyfill
     if (typeof GM === 'undefined' || !GM.setClipboard) {
         window.GM = window.GM || {};
         GM.setClipboard = function(text) {
@@ -162,7 +129,7 @@ class CodeConverter:
         };
     }''',
 
-            'GM.openInTab': '''    // GM.openInTab polyfill
+        'GM.openInTab': '''    // GM.openInTab polyfill
     if (typeof GM === 'undefined' || !GM.openInTab) {
         window.GM = window.GM || {};
         GM.openInTab = function(url, options) {
@@ -171,7 +138,7 @@ class CodeConverter:
         };
     }''',
 
-            'GM.download': '''    // GM.download polyfill
+        'GM.download': '''    // GM.download polyfill
     if (typeof GM === 'undefined' || !GM.download) {
         window.GM = window.GM || {};
         GM.download = function(details) {
@@ -182,10 +149,48 @@ class CodeConverter:
             }, details.onload || (() => {}));
         };
     }''',
-        }
+    }
 
-        return polyfills.get(api, '')
+    def __init__(self, metadata: UserScriptMetadata):
+        self.metadata = metadata
+
+    def convert(self, code_body: str) -> str:
+        """转换脚本代码，添加必要的polyfill"""
+        parts = []
+
+        # 1. 添加GM API polyfill（如果需要）
+        if self.metadata.uses_gm_api():
+            polyfill = self._generate_polyfill()
+            if polyfill:
+                parts.append(polyfill)
+
+        # 2. 添加原始代码
+        parts.append(code_body)
+
+        return '\n\n'.join(parts)
+
+    def _generate_polyfill(self) -> str:
+        """生成GM API polyfill代码"""
+        needed_apis = self.metadata.get_required_apis()
+
+        if not needed_apis:
+            return ''
+
+        return _build_polyfill(tuple(needed_apis))
 
     def save(self, code: str, output_path: Path):
         """保存转换后的代码"""
-        output_path.write_text(code, encoding='utf-8')
+        atomic_write_bytes(output_path, code.encode('utf-8'))
+
+
+@lru_cache(maxsize=64)
+def _build_polyfill(apis: Tuple[str, ...]) -> str:
+    """按API组合生成polyfill代码（相同组合复用结果）"""
+    polyfills = CodeConverter.POLYFILLS
+
+    # 一次拼接：头部 + 每个API的polyfill（各占一行） + 尾部
+    return ''.join([
+        CodeConverter.POLYFILL_HEADER,
+        *(polyfills[api] + '\n' for api in apis if polyfills.get(api)),
+        CodeConverter.POLYFILL_FOOTER,
+    ])
@@ -3,14 +3,58 @@
 处理@require指定的外部库下载
 """
 
+import json
+import os
+import tempfile
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Optional
-from urllib.parse import urlparse
+from typing import Dict, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    import h2  # noqa: F401  httpx的HTTP/2支持依赖h2
+    import httpx
+
+    HTTPX_AVAILABLE = True
+    NETWORK_ERRORS = (requests.RequestException, httpx.HTTPError)
+except ImportError:
+    HTTPX_AVAILABLE = False
+    NETWORK_ERRORS = (requests.RequestException,)
+
+# 请求头（模拟浏览器请求）
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+}
+
+# 并发下载的最大线程数
+MAX_WORKERS = 8
+
+# 下载时每次写入的块大小
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# 缓存校验信息（ETag / Last-Modified）文件后缀
+ETAG_SUFFIX = ".etag"
+
+# 模块级共享HTTP会话（惰性创建），多次构建复用连接池
+_SESSION = None
+
+
+def _get_session():
+    """获取共享HTTP会话：优先使用支持HTTP/2多路复用的httpx，否则回退到requests"""
+    global _SESSION
+    if _SESSION is None:
+        if HTTPX_AVAILABLE:
+            _SESSION = httpx.Client(
+                http2=True, headers=DEFAULT_HEADERS, follow_redirects=True
+            )
+        else:
+            _SESSION = requests.Session()
+            _SESSION.headers.update(DEFAULT_HEADERS)
+    return _SESSION
+
 
 class DependencyFetcher:
     """外部依赖下载器"""
@@ -18,18 +62,17 @@ class DependencyFetcher:
     def __init__(self, lib_dir: Path, timeout: int = 30):
         self.lib_dir = lib_dir
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-            }
-        )
+        self.use_httpx = HTTPX_AVAILABLE
+        self.session = _get_session()
 
     def fetch_all(self, urls: List[str]) -> List[str]:
         """下载所有外部依赖，返回文件名列表"""
         if not urls:
             return []
 
+        # 去除重复的@require（保持声明顺序）
+        urls = list(dict.fromkeys(urls))
+
         # Chrome Web Store警告：检查是否使用了远程依赖
         logger.warning(
             "Chrome Web Store policy: All code must be included in the extension package. "
@@ -38,49 +81,150 @@ class DependencyFetcher:
         )
 
         self.lib_dir.mkdir(parents=True, exist_ok=True)
-        downloaded = []
 
-        for url in urls:
-            try:
-                filename = self.fetch(url)
-                if filename:
-                    downloaded.append(filename)
-                    logger.info(f"Downloaded: {url} -> {filename}")
-            except Exception as e:
-                logger.error(f"Failed to download {url}: {e}")
-
-        return downloaded
+        # 结果按URL原始顺序保存；已存在且无需重新验证的文件不再调度下载
+        # 不同URL可能映射到同一本地文件名：只保留第一个URL，避免并发写同一文件及manifest重复注入
+        results: List[Optional[str]] = [None] * len(urls)
+        claimed: Dict[str, str] = {}
+        pending: Dict[str, int] = {}
+        for index, url in enumerate(urls):
+            filename = self._filename_for(url)
+            if filename in claimed:
+                logger.warning(f"{url} maps to the same file as {claimed[filename]}: {filename}")
+                continue
+            claimed[filename] = url
+
+            output_path = self.lib_dir / filename
+            if output_path.exists() and not self._validator_path(output_path).exists():
+                logger.info(f"File already exists: {filename}")
+                results[index] = filename
+            else:
+                pending[filename] = index
+
+        # 并发下载（I/O密集）
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(pending))) as executor:
+                futures = {
+                    executor.submit(self.fetch, urls[index]): index
+                    for index in pending.values()
+                }
+                for future in as_completed(futures):
+                    index = futures[future]
+                    url = urls[index]
+                    try:
+                        filename = future.result()
+                        if filename:
+                            results[index] = filename
+                            logger.info(f"Downloaded: {url} -> {filename}")
+                    except Exception as e:
+                        logger.error(f"Failed to download {url}: {e}")
+
+        return [filename for filename in results if filename]
 
     def fetch(self, url: str) -> Optional[str]:
         """下载单个依赖，返回文件名"""
-        # 解析URL获取文件名
-        parsed = urlparse(url)
-        filename = parsed.path.split("/")[-1]
-
-        # 如果没有扩展名，添加.js
-        if not filename.endswith(".js") and "." not in filename:
-            filename += ".js"
-
+        filename = self._filename_for(url)
         output_path = self.lib_dir / filename
+        validator_path = self._validator_path(output_path)
 
-        # 如果文件已存在，跳过
+        # 如果文件已存在：有缓存校验信息则发送条件请求，否则直接跳过
+        headers = {}
         if output_path.exists():
-            logger.info(f"File already exists: {output_path.name}")
-            return filename
+            validators = self._load_validators(validator_path)
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+            if not headers:
+                logger.info(f"File already exists: {output_path.name}")
+                return filename
 
         # 下载文件
         logger.info(f"Downloading {url}...")
+        # 每个下载任务使用唯一的临时文件，任何异常（含磁盘写满、中断）都会清理
+        fd, partial_name = tempfile.mkstemp(
+            dir=self.lib_dir, prefix=output_path.name + ".", suffix=".part"
+        )
+        os.close(fd)
+        partial_path = Path(partial_name)
         try:
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
-
-            # 保存文件
-            output_path.write_bytes(response.content)
-            return filename
-
-        except requests.RequestException as e:
+            with self._stream(url, headers) as response:
+                # 304：远程文件未修改，复用本地文件
+                if response.status_code == 304:
+                    logger.info(f"Not modified: {output_path.name}")
+                    return filename
+
+                response.raise_for_status()
+
+                # 分块写入临时文件，避免在内存中保存完整响应体
+                with partial_path.open("wb") as f:
+                    for chunk in self._iter_chunks(response):
+                        f.write(chunk)
+                # mkstemp创建的文件权限为0600，恢复为普通文件权限
+                os.chmod(partial_path, 0o644)
+                partial_path.replace(output_path)
+
+                # 保存缓存校验信息
+                self._save_validators(validator_path, response)
+                return filename
+
+        except NETWORK_ERRORS as e:
+            if headers:
+                # 重新验证失败时继续使用本地文件
+                logger.warning(f"Revalidation failed, using local file {output_path.name}: {e}")
+                return filename
             logger.error(f"Download failed: {e}")
             return None
+        finally:
+            partial_path.unlink(missing_ok=True)
+
+    def _stream(self, url: str, headers: Dict[str, str]):
+        """发起流式GET请求，返回响应上下文管理器"""
+        if self.use_httpx:
+            return self.session.stream("GET", url, headers=headers, timeout=self.timeout)
+        return self.session.get(url, timeout=self.timeout, headers=headers, stream=True)
+
+    def _iter_chunks(self, response):
+        """按块迭代响应体"""
+        if self.use_httpx:
+            return response.iter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE)
+        return response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+
+    def _filename_for(self, url: str) -> str:
+        """根据URL计算本地文件名"""
+        # 去除查询参数和锚点，取路径最后一段作为文件名
+        filename = url.split("?", 1)[0].split("#", 1)[0].rsplit("/", 1)[-1]
+
+        # 如果没有扩展名，添加.js
+        if not filename.endswith(".js") and "." not in filename:
+            filename += ".js"
+
+        return filename
+
+    def _validator_path(self, output_path: Path) -> Path:
+        """获取缓存校验信息文件路径"""
+        return output_path.with_suffix(output_path.suffix + ETAG_SUFFIX)
+
+    def _load_validators(self, validator_path: Path) -> Dict[str, str]:
+        """读取缓存校验信息（ETag / Last-Modified）"""
+        if not validator_path.exists():
+            return {}
+        try:
+            return json.loads(validator_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_validators(self, validator_path: Path, response):
+        """保存响应中的缓存校验信息"""
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        validators = {key: value for key, value in validators.items() if value}
+        if validators:
+            validator_path.write_text(json.dumps(validators), encoding="utf-8")
+        elif validator_path.exists():
+            validator_path.unlink()
 
     def clear(self):
         """清空lib目录"""
@@ -4,9 +4,18 @@ Manifest V3生成器
 """
 
 import json
-from typing import Dict, List, Any, Optional, Set
+from functools import cached_property
+from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 from .parser import UserScriptMetadata
+from utils.fileio import atomic_write_bytes
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 
 class ManifestV3Generator:
@@ -26,6 +35,13 @@ class ManifestV3Generator:
         "GM_download": ["downloads", "<all_urls>"],
     }
 
+    # UserScript run-at到Manifest run_at的映射
+    RUN_AT_MAP: Dict[str, str] = {
+        "document-start": "document_start",
+        "document-end": "document_end",
+        "document-idle": "document_idle",
+    }
+
     def __init__(
         self,
         metadata: UserScriptMetadata,
@@ -39,16 +55,17 @@ class ManifestV3Generator:
 
     def generate(self) -> Dict[str, Any]:
         """生成Manifest V3配置"""
+        m = self.metadata
         self.manifest = {
             "manifest_version": 3,
-            "name": self.metadata.name,
+            "name": m.name,
             "version": self._normalize_version(),
-            "description": self.metadata.description,
+            "description": m.description,
             "content_scripts": [
                 {
-                    "matches": self._get_match_patterns(),
+                    "matches": m.match_patterns or ["<all_urls>"],
                     "js": self._get_js_files(),
-                    "run_at": self._get_run_at(),
+                    "run_at": self.RUN_AT_MAP.get(m.run_at, "document_end"),
                 }
             ],
         }
@@ -67,8 +84,8 @@ class ManifestV3Generator:
         if icons:
             self.manifest["icons"] = icons
 
-        if self.metadata.homepage_url:
-            self.manifest["homepage_url"] = self.metadata.homepage_url
+        if m.homepage_url:
+            self.manifest["homepage_url"] = m.homepage_url
 
         return self.manifest
 
@@ -95,64 +112,55 @@ class ManifestV3Generator:
             "128": "icons/icon128.png",
         }
 
-    def _get_permissions(self) -> List[str]:
-        """获取权限列表"""
-        permissions: Set[str] = set()
+    @cached_property
+    def _permission_buckets(self) -> Tuple[Dict[str, None], Dict[str, None]]:
+        """单次遍历GM API，拆分为 (权限, 主机权限) 两组（dict用作有序去重集合）"""
+        permissions: Dict[str, None] = {}
+        hosts: Dict[str, None] = {}
 
         # 从GM API推断权限
+        perm_lookup = self.GM_API_PERMISSIONS.get
         for grant in self.metadata.grant_permissions:
-            if grant != "none" and grant in self.GM_API_PERMISSIONS:
-                for perm in self.GM_API_PERMISSIONS[grant]:
-                    if perm and not perm.startswith("<all_urls>"):
-                        permissions.add(perm)
+            for perm in perm_lookup(grant, ()):
+                if perm.startswith("<all_urls>"):
+                    hosts["<all_urls>"] = None
+                else:
+                    permissions[perm] = None
 
-        return sorted(list(permissions))
+        return permissions, hosts
+
+    def _get_permissions(self) -> List[str]:
+        """获取权限列表"""
+        if not self.metadata.grant_permissions:
+            return []
+        return sorted(self._permission_buckets[0])
 
     def _get_host_permissions(self) -> List[str]:
         """获取主机权限"""
-        hosts: Set[str] = set()
+        if not self.metadata.grant_permissions and not self.metadata.connect_urls:
+            return []
 
-        # 从GM API推断主机权限
-        for grant in self.metadata.grant_permissions:
-            if grant != "none" and grant in self.GM_API_PERMISSIONS:
-                for perm in self.GM_API_PERMISSIONS[grant]:
-                    if perm and perm.startswith("<all_urls>"):
-                        hosts.add("<all_urls>")
+        hosts = dict(self._permission_buckets[1])
 
         # 从connect URLs添加
-        hosts.update(self.metadata.connect_urls)
-
-        return sorted(list(hosts))
-
-    def _get_match_patterns(self) -> List[str]:
-        """获取match patterns"""
-        return (
-            self.metadata.match_patterns
-            if self.metadata.match_patterns
-            else ["<all_urls>"]
-        )
-
-    def _get_run_at(self) -> str:
-        """获取脚本运行时机"""
-        run_at_map = {
-            "document-start": "document_start",
-            "document-end": "document_end",
-            "document-idle": "document_idle",
-        }
-        return run_at_map.get(self.metadata.run_at, "document_end")
+        hosts.update(dict.fromkeys(self.metadata.connect_urls))
+
+        return sorted(hosts)
 
     def _get_js_files(self) -> List[str]:
         """获取JS文件列表（包括依赖库）"""
-        js_files = []
-        # 添加外部库依赖
-        if self.lib_files:
-            js_files.extend([f"lib/{lib}" for lib in self.lib_files])
-        # 添加主脚本
-        js_files.append("content.js")
-        return js_files
+        # 外部库依赖在前，主脚本在后
+        if not self.lib_files:
+            return ["content.js"]
+        return [f"lib/{lib}" for lib in self.lib_files] + ["content.js"]
 
     def save(self, output_path: Path):
         """保存manifest.json"""
-        output_path.write_text(
-            json.dumps(self.manifest, indent=2, ensure_ascii=False), encoding="utf-8"
-        )
+        if ORJSON_AVAILABLE:
+            # orjson直接输出UTF-8字节，格式与json.dumps(indent=2)一致
+            payload = orjson.dumps(self.manifest, option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(self.manifest, indent=2, ensure_ascii=False).encode(
+                "utf-8"
+            )
+        atomic_write_bytes(output_path, payload)
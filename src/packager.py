@@ -7,18 +7,55 @@ import json
 import logging
 import os
 import platform
-import shutil
 import webbrowser
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from utils.fileio import fast_copy
+from utils.assets import scan_store_assets
+from utils.image import open_icon
+
 try:
     from PIL import Image
     PIL_AVAILABLE = True
 except ImportError:
     PIL_AVAILABLE = False
 
+# DEFLATE默认压缩级别（1最快，9压缩率最高）；可在upload_config.json中通过compresslevel覆盖
+DEFAULT_COMPRESSLEVEL = 1
+
+# ZIP压缩档位（upload_config.json中的compression_tier）：(压缩方式, 默认压缩级别)
+# - fast: 仅存储不压缩，打包最快，适合开发调试
+# - balanced: DEFLATE快速压缩（默认）
+# - max: DEFLATE最高级别压缩，体积最小
+# Chrome / Edge 商店只接受存储或DEFLATE条目，因此不使用LZMA等其他压缩方式
+COMPRESSION_TIERS = {
+    "fast": (zipfile.ZIP_STORED, DEFAULT_COMPRESSLEVEL),
+    "balanced": (zipfile.ZIP_DEFLATED, DEFAULT_COMPRESSLEVEL),
+    "max": (zipfile.ZIP_DEFLATED, 9),
+}
+DEFAULT_COMPRESSION_TIER = "balanced"
+
+# 不打包进ZIP的文件后缀（依赖下载器生成的缓存校验文件、下载/写入中断残留的临时文件）
+EXCLUDED_SUFFIXES = (".etag", ".part", ".tmp")
+
+# 不打包进ZIP的目录和文件名（版本控制、缓存、系统文件等开发残留）
+EXCLUDED_NAMES = frozenset(
+    {".git", "__pycache__", "node_modules", ".DS_Store", "Thumbs.db"}
+)
+
+# 已压缩格式的文件直接存储（ZIP_STORED），再次DEFLATE几乎无收益
+STORED_SUFFIXES = frozenset(
+    {".png", ".jpg", ".jpeg", ".webp", ".gif", ".woff", ".woff2", ".zip"}
+)
+
+# 打包时读取文件的缓冲区大小
+READ_BUFFER_SIZE = 1024 * 1024
+
 
 def load_upload_config(script_dir: Path) -> Optional[Dict]:
     """
@@ -45,9 +82,10 @@ def load_upload_config(script_dir: Path) -> Optional[Dict]:
         return None
 
 
+@lru_cache(maxsize=1)
 def detect_wsl() -> bool:
     """
-    检测是否运行在WSL环境
+    检测是否运行在WSL环境（运行期间不会变化，结果缓存）
 
     Returns:
         bool: True表示WSL环境，False表示其他环境
@@ -65,6 +103,8 @@ def copy_store_assets_to_downloads(
     script_dir: Path,
     zip_filename: str,
     output_path: Path,
+    assets: Optional[Dict] = None,
+    downloads_dir: Optional[Path] = None,
 ) -> None:
     """
     复制 store_assets 中的图片到下载目录
@@ -73,19 +113,23 @@ def copy_store_assets_to_downloads(
         script_dir: 脚本目录路径
         zip_filename: ZIP 文件名（含 .zip 扩展名）
         output_path: 当前输出路径
+        assets: scan_store_assets 的扫描结果，未提供时自动扫描
+        downloads_dir: 已解析的下载目录，未提供时自动计算
     """
     logger = logging.getLogger(__name__)
 
     # 确定下载目录
-    downloads_dir = Path.home() / "Downloads"
+    if downloads_dir is None:
+        downloads_dir = (Path.home() / "Downloads").resolve()
 
     # 如果输出目录不是下载目录，才需要复制
-    if output_path == downloads_dir or output_path.resolve() == downloads_dir.resolve():
+    if output_path.resolve() == downloads_dir:
         logger.debug("Output is already in Downloads, skipping copy")
         return
 
-    store_assets_dir = script_dir / "store_assets"
-    if not store_assets_dir.exists():
+    if assets is None:
+        assets = scan_store_assets(script_dir)
+    if not assets["exists"]:
         return
 
     # 创建目标子目录：zip_name + _assets
@@ -93,14 +137,14 @@ def copy_store_assets_to_downloads(
     assets_output_dir = downloads_dir / assets_dir_name
     assets_output_dir.mkdir(parents=True, exist_ok=True)
 
+    # 源目录与目标目录在同一文件系统时使用硬链接（不复制数据）
+    store_assets_dir = script_dir / "store_assets"
+    use_hardlink = os.stat(store_assets_dir).st_dev == os.stat(assets_output_dir).st_dev
+
     # 复制所有图片文件
-    image_extensions = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
     copied_count = 0
 
-    for img_file in store_assets_dir.iterdir():
-        if img_file.suffix.lower() not in image_extensions:
-            continue
-
+    for img_file in assets["images"]:
         # 特殊处理 icon.png -> icon128.png (128x128)
         if img_file.name == "icon.png":
             if not PIL_AVAILABLE:
@@ -109,9 +153,12 @@ def copy_store_assets_to_downloads(
 
             target_path = assets_output_dir / "icon128.png"
             try:
-                with Image.open(img_file) as img:
-                    img_resized = img.resize((128, 128), Image.Resampling.LANCZOS)
-                    img_resized.save(target_path, "PNG")
+                # 复用生成图标时已解码的源图片
+                img = open_icon(img_file, 128)
+                img_resized = img.resize(
+                    (128, 128), Image.Resampling.LANCZOS, reducing_gap=3.0
+                )
+                img_resized.save(target_path, "PNG")
                 logger.info(f"Copied and resized: {target_path}")
                 copied_count += 1
             except Exception as e:
@@ -119,7 +166,16 @@ def copy_store_assets_to_downloads(
         else:
             # 直接复制其他图片
             target_path = assets_output_dir / img_file.name
-            shutil.copy2(img_file, target_path)
+            # 先删除旧目标（可能是上次运行留下的指向源文件的硬链接），再链接或复制
+            target_path.unlink(missing_ok=True)
+            if use_hardlink:
+                try:
+                    os.link(img_file, target_path)
+                except OSError:
+                    use_hardlink = False
+                    fast_copy(img_file, target_path)
+            else:
+                fast_copy(img_file, target_path)
             logger.info(f"Copied: {target_path}")
             copied_count += 1
 
@@ -127,11 +183,96 @@ def copy_store_assets_to_downloads(
         logger.info(f"Copied {copied_count} asset file(s) to {assets_output_dir}")
 
 
+def iter_extension_files(directory: str, prefix: str = ""):
+    """
+    递归遍历extension目录，逐个产出待打包文件（跳过 .git、node_modules 等开发残留）
+
+    Args:
+        directory: 当前遍历的目录路径
+        prefix: 当前目录在ZIP中的路径前缀（以 / 结尾）
+
+    Yields:
+        (文件完整路径, ZIP内路径) 元组
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name in EXCLUDED_NAMES:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_extension_files(entry.path, prefix + entry.name + "/")
+            elif entry.is_file() and not entry.name.endswith(EXCLUDED_SUFFIXES):
+                yield entry.path, prefix + entry.name
+
+
+def compress_entry(file_path: str, arcname: str, compression: int, compresslevel: int):
+    """
+    读取并压缩单个文件（zlib压缩期间释放GIL，可在线程池中并行执行）
+
+    PNG、JPG、WOFF等已压缩格式直接存储，不再压缩
+
+    Args:
+        file_path: 文件完整路径
+        arcname: ZIP内路径
+        compression: 压缩方式（ZIP_STORED / ZIP_DEFLATED）
+        compresslevel: DEFLATE压缩级别
+
+    Returns:
+        (已填写CRC和大小信息的ZipInfo, 压缩后的数据) 元组
+    """
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    with open(file_path, "rb", buffering=READ_BUFFER_SIZE) as f:
+        data = f.read()
+
+    if (
+        compression == zipfile.ZIP_STORED
+        or os.path.splitext(arcname)[1].lower() in STORED_SUFFIXES
+    ):
+        # 不压缩，或已压缩格式直接存储
+        payload = data
+        zinfo.compress_type = zipfile.ZIP_STORED
+    else:
+        # ZIP使用不带zlib头的原始DEFLATE流（wbits=-15）
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+        payload = compressor.compress(data) + compressor.flush()
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+
+    zinfo.CRC = zlib.crc32(data)
+    zinfo.file_size = len(data)
+    zinfo.compress_size = len(payload)
+    return zinfo, payload
+
+
+class PrecompressedZipFile(zipfile.ZipFile):
+    """支持直接写入已压缩数据的ZipFile"""
+
+    def write_compressed(self, zinfo: zipfile.ZipInfo, payload: bytes) -> None:
+        """
+        写入已压缩的条目，不再重新压缩
+
+        Args:
+            zinfo: 已填写 compress_type、CRC、file_size、compress_size 的 ZipInfo
+            payload: 压缩后的数据
+        """
+        with self._lock:
+            self.fp.seek(self.start_dir)
+            zinfo.header_offset = self.fp.tell()
+            self._writecheck(zinfo)
+            self._didModify = True
+
+            self.fp.write(zinfo.FileHeader())
+            self.fp.write(payload)
+            self.start_dir = self.fp.tell()
+
+            self.filelist.append(zinfo)
+            self.NameToInfo[zinfo.filename] = zinfo
+
+
 def package_extension(
     extension_dir: Path,
     script_filename: str,
     config: Optional[Dict],
     script_dir: Path,
+    assets: Optional[Dict] = None,
 ) -> Optional[Path]:
     """
     打包extension目录为ZIP文件
@@ -141,6 +282,7 @@ def package_extension(
         script_filename: 脚本文件名（不含扩展名），用于默认ZIP命名
         config: 上传配置（可能为None）
         script_dir: 脚本目录路径（用于解析相对路径）
+        assets: scan_store_assets 的扫描结果，未提供时自动扫描
 
     Returns:
         生成的ZIP文件路径，失败时返回None
@@ -176,6 +318,10 @@ def package_extension(
     # 确保输出目录存在
     output_path.mkdir(parents=True, exist_ok=True)
 
+    # 解析一次路径，供后续比较使用
+    output_resolved = output_path.resolve()
+    downloads_dir = (Path.home() / "Downloads").resolve()
+
     zip_file_path = output_path / zip_filename
 
     # 删除已存在的ZIP文件
@@ -183,27 +329,60 @@ def package_extension(
         zip_file_path.unlink()
         logger.debug(f"Removed existing ZIP file: {zip_file_path}")
 
+    # 确定压缩档位
+    tier = DEFAULT_COMPRESSION_TIER
+    if config and "compression_tier" in config:
+        tier = config["compression_tier"]
+        if tier not in COMPRESSION_TIERS:
+            logger.warning(
+                f"Invalid compression_tier '{tier}' in upload_config.json "
+                f"(expected one of: {', '.join(COMPRESSION_TIERS)}), "
+                f"using '{DEFAULT_COMPRESSION_TIER}'"
+            )
+            tier = DEFAULT_COMPRESSION_TIER
+    compression, tier_compresslevel = COMPRESSION_TIERS[tier]
+
+    # 确定压缩级别（显式配置的compresslevel优先于档位默认值）
+    compresslevel = tier_compresslevel
+    if config and "compresslevel" in config:
+        compresslevel = config["compresslevel"]
+        if not isinstance(compresslevel, int) or not 0 <= compresslevel <= 9:
+            logger.warning(
+                f"Invalid compresslevel '{compresslevel}' in upload_config.json "
+                f"(expected 0-9), using {tier_compresslevel}"
+            )
+            compresslevel = tier_compresslevel
+
     # 创建ZIP文件
     try:
-        with zipfile.ZipFile(zip_file_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(extension_dir):
-                for file in files:
-                    file_path = Path(root) / file
-                    arcname = file_path.relative_to(extension_dir)
-                    zipf.write(file_path, arcname)
+        files = list(iter_extension_files(str(extension_dir)))
+        with PrecompressedZipFile(
+            zip_file_path, "w", compression, compresslevel=compresslevel
+        ) as zipf, ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            # 并行压缩各文件，按原顺序写入ZIP
+            entries = executor.map(
+                lambda item: compress_entry(
+                    item[0], item[1], compression, compresslevel
+                ),
+                files,
+            )
+            for zinfo, payload in entries:
+                zipf.write_compressed(zinfo, payload)
 
         logger.info(f"Packaged: {zip_file_path}")
         logger.info(f"  Size: {zip_file_path.stat().st_size:,} bytes")
 
-        # 复制 ZIP 到下载目录（如果输出路径不是下载目录）
-        downloads_dir = Path.home() / "Downloads"
-        if output_path != downloads_dir and output_path.resolve() != downloads_dir.resolve():
+        # 复制 ZIP 和 store_assets 图片到下载目录（如果输出路径不是下载目录）
+        if output_resolved != downloads_dir:
             downloads_zip_path = downloads_dir / zip_filename
-            shutil.copy2(zip_file_path, downloads_zip_path)
+            fast_copy(zip_file_path, downloads_zip_path)
             logger.info(f"Copied ZIP to Downloads: {downloads_zip_path}")
 
-        # 复制 store_assets 图片到下载目录
-        copy_store_assets_to_downloads(script_dir, zip_filename, output_path)
+            copy_store_assets_to_downloads(
+                script_dir, zip_filename, output_resolved, assets, downloads_dir
+            )
+        else:
+            logger.debug("Output is already in Downloads, skipping copy")
 
         return zip_file_path
 
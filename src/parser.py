@@ -4,12 +4,12 @@ UserScript元数据解析器
 """
 
 import re
-from dataclasses import dataclass
-from typing import List, Optional, Dict
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Tuple
 from pathlib import Path
 
 
-@dataclass
+@dataclass(slots=True)
 class UserScriptMetadata:
     """UserScript元数据"""
     name: str
@@ -30,20 +30,22 @@ class UserScriptMetadata:
     support_url: Optional[str]
     homepage_url: Optional[str]
     raw_metadata: Dict[str, List[str]]
+    # 需要polyfill的GM API（构造时根据grant_permissions计算一次）
+    _gm_apis: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._gm_apis = tuple(
+            grant for grant in self.grant_permissions
+            if grant != 'none' and grant.startswith('GM')
+        )
 
     def uses_gm_api(self) -> bool:
         """是否使用了GM API"""
-        return any(
-            grant != 'none' and grant.startswith('GM')
-            for grant in self.grant_permissions
-        )
+        return bool(self._gm_apis)
 
     def get_required_apis(self) -> List[str]:
         """获取需要的GM API列表"""
-        return [
-            grant for grant in self.grant_permissions
-            if grant != 'none' and grant.startswith('GM')
-        ]
+        return list(self._gm_apis)
 
 
 class UserScriptParser:
@@ -55,16 +57,30 @@ class UserScriptParser:
         re.DOTALL
     )
 
-    # 元数据行匹配
-    METADATA_LINE_PATTERN = re.compile(r'// @(\S+)\s+(.+)')
+    # 元数据块搜索优先扫描的头部长度（字符数）
+    HEADER_SCAN_SIZE = 16384
+
+    # 元数据行匹配（多行模式，一次扫描整个元数据块；[^\S\n]为不含换行的空白）
+    METADATA_LINE_PATTERN = re.compile(
+        r'^[^\S\n]*// @(\S+)[^\S\n]+(\S.*?)[^\S\n]*$',
+        re.MULTILINE
+    )
 
     def __init__(self, script_path: Path):
         self.script_path = script_path
         self.metadata: Optional[UserScriptMetadata] = None
+        self._content: Optional[str] = None
+        self._block_span: Optional[Tuple[int, int]] = None
+
+    def _read_content(self) -> str:
+        """读取脚本内容（只读取一次，parse与extract_code_body共用）"""
+        if self._content is None:
+            self._content = self.script_path.read_text(encoding='utf-8')
+        return self._content
 
     def parse(self) -> UserScriptMetadata:
         """解析脚本文件，提取元数据"""
-        content = self.script_path.read_text(encoding='utf-8')
+        content = self._read_content()
         metadata_block = self._extract_metadata_block(content)
         raw_metadata = self._parse_metadata_lines(metadata_block)
 
@@ -92,29 +108,34 @@ class UserScriptParser:
 
     def extract_code_body(self) -> str:
         """提取脚本主体代码（去除元数据块）"""
-        content = self.script_path.read_text(encoding='utf-8')
-        # 移除元数据块
-        code = self.METADATA_BLOCK_PATTERN.sub('', content)
+        content = self._read_content()
+        if self._block_span is None:
+            try:
+                self._extract_metadata_block(content)
+            except ValueError:
+                return content.strip()
+        # 移除元数据块（复用已定位的位置，直接切片）
+        start, end = self._block_span
+        code = content[:start] + content[end:]
         return code.strip()
 
     def _extract_metadata_block(self, content: str) -> str:
         """提取UserScript元数据块"""
-        match = self.METADATA_BLOCK_PATTERN.search(content)
+        # 元数据块通常位于文件开头，先只扫描头部，找不到再扫描全文
+        match = self.METADATA_BLOCK_PATTERN.search(content, 0, self.HEADER_SCAN_SIZE)
+        if not match and len(content) > self.HEADER_SCAN_SIZE:
+            match = self.METADATA_BLOCK_PATTERN.search(content)
         if not match:
             raise ValueError(f"No UserScript metadata block found in {self.script_path}")
+        self._block_span = match.span()
         return match.group(1)
 
     def _parse_metadata_lines(self, block: str) -> Dict[str, List[str]]:
         """解析元数据行"""
-        metadata = {}
-        for line in block.split('\n'):
-            line = line.strip()
-            match = self.METADATA_LINE_PATTERN.match(line)
-            if match:
-                key, value = match.groups()
-                if key not in metadata:
-                    metadata[key] = []
-                metadata[key].append(value)
+        metadata: Dict[str, List[str]] = {}
+        for match in self.METADATA_LINE_PATTERN.finditer(block):
+            key, value = match.groups()
+            metadata.setdefault(key, []).append(value)
         return metadata
 
     def _get_first_value(self, metadata: Dict, key: str, default=None):
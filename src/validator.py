@@ -4,9 +4,15 @@
 """
 
 import logging
+import re
 from pathlib import Path
+from typing import Dict, Optional
 
 from src.parser import UserScriptMetadata
+from utils.assets import scan_store_assets
+
+# 版本号格式：1~4 段数字
+VERSION_PATTERN = re.compile(r"^\d+(\.\d+){0,3}$")
 
 
 def validate_store_readiness(metadata: UserScriptMetadata, script_dir: Path) -> None:
@@ -52,16 +58,14 @@ def validate_store_readiness(metadata: UserScriptMetadata, script_dir: Path) ->
         )
 
     # 检查5: 版本号格式
-    import re
-
-    if not re.match(r"^\d+(\.\d+){0,3}$", metadata.version.lstrip("vV")):
+    if not VERSION_PATTERN.match(metadata.version.lstrip("vV")):
         logger.warning(
             f"Version '{metadata.version}' may not follow Chrome Web Store format. "
             "Recommended format: x.y.z (e.g., 1.0.0)"
         )
 
 
-def validate_store_assets(script_dir: Path) -> dict:
+def validate_store_assets(script_dir: Path, assets: Optional[Dict] = None) -> dict:
     """
     验证Chrome Web Store上架所需的材料
 
@@ -71,6 +75,7 @@ def validate_store_assets(script_dir: Path) -> dict:
 
     Args:
         script_dir: 脚本目录路径
+        assets: scan_store_assets 的扫描结果，未提供时自动扫描
 
     Returns:
         dict: 包含 'has_icon' 和 'screenshot_count' 的字典
@@ -80,25 +85,25 @@ def validate_store_assets(script_dir: Path) -> dict:
     """
     logger = logging.getLogger(__name__)
 
-    config_dir = script_dir / "store_assets"
-    icon_path = config_dir / "icon.png"
+    if assets is None:
+        assets = scan_store_assets(script_dir)
 
     # store_assets 目录必须存在
-    if not config_dir.exists():
+    if not assets["exists"]:
         raise RuntimeError(
             f"store_assets directory is required for Chrome Web Store submission. "
             f"Create it with: 1) icon.png (required) 2) at least 1 screenshot *.png or *.jpg (required)"
         )
 
     # 检查图标
-    if not icon_path.exists():
+    if assets["icon"] is None:
         raise RuntimeError(
             f"icon.png not found in store_assets/. "
             f"This is required for Chrome Web Store submission."
         )
 
     # 检查截图（直接在 store_assets 目录下）
-    screenshot_files = list(config_dir.glob("*.png")) + list(config_dir.glob("*.jpg"))
+    screenshot_files = assets["screenshots"]
 
     if len(screenshot_files) == 0:
         raise RuntimeError(
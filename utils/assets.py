@@ -0,0 +1,54 @@
+"""
+商店素材工具
+扫描 store_assets 目录中的图标与截图（不依赖 PIL，验证和打包共用）
+"""
+
+import os
+from pathlib import Path
+from typing import Dict
+
+# 截图文件后缀
+SCREENSHOT_EXTENSIONS = frozenset({".png", ".jpg"})
+
+# 商店素材图片文件后缀
+IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".webp"})
+
+
+def scan_store_assets(script_dir: Path) -> Dict:
+    """
+    一次性扫描 store_assets 目录，供验证和打包共用
+
+    Args:
+        script_dir: 脚本目录路径
+
+    Returns:
+        dict: 包含以下键的字典
+            - exists: store_assets 目录是否存在
+            - icon: icon.png 路径（不存在时为 None）
+            - screenshots: 截图文件（*.png / *.jpg）路径列表
+            - images: 所有图片文件路径列表
+    """
+    assets = {"exists": False, "icon": None, "screenshots": [], "images": []}
+
+    assets_dir = script_dir / "store_assets"
+    try:
+        entries = os.scandir(assets_dir)
+    except (FileNotFoundError, NotADirectoryError):
+        return assets
+
+    assets["exists"] = True
+    with entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            suffix = os.path.splitext(entry.name)[1].lower()
+            if suffix not in IMAGE_EXTENSIONS:
+                continue
+            path = Path(entry.path)
+            assets["images"].append(path)
+            if suffix in SCREENSHOT_EXTENSIONS:
+                assets["screenshots"].append(path)
+            if entry.name == "icon.png":
+                assets["icon"] = path
+
+    return assets
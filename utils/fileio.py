@@ -0,0 +1,72 @@
+"""
+文件读写工具
+原子写入与快速复制
+"""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+
+def atomic_write_bytes(output_path: Path, data: bytes) -> None:
+    """
+    原子写入文件内容
+
+    Args:
+        output_path: 目标文件路径
+        data: 要写入的字节内容
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+# Linux FICLONE ioctl 请求码（btrfs / xfs 等文件系统的 reflink 复制）
+FICLONE = 0x40049409
+
+
+def fast_copy(src: Path, dst: Path) -> None:
+    """
+    复制文件：优先使用 reflink（写时复制，不移动数据），否则回退到 shutil.copy2
+
+    shutil.copy2 在 Linux 上使用 os.sendfile、在 macOS 上使用 fcopyfile，
+    数据在内核中复制，无需经过用户态缓冲区。先复制到同目录临时文件再原子替换，
+    即使 dst 是 src 的硬链接也不会截断源文件
+
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+    """
+    dst = Path(dst)
+    tmp_path = dst.with_suffix(dst.suffix + ".tmp")
+    try:
+        if not _reflink(src, tmp_path):
+            shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """尝试 reflink 复制，成功返回 True"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import fcntl
+
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        # 文件系统不支持reflink或跨设备，回退到普通复制
+        return False
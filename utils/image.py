@@ -3,6 +3,7 @@
 从单一图标源文件生成多尺寸图标
 """
 
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
 import logging
@@ -17,6 +18,36 @@ except ImportError:
     PIL_AVAILABLE = False
     logger.warning("PIL not available, icon generation will be skipped")
 
+def open_icon(source_path: Path, max_size: int = 128) -> "Image.Image":
+    """
+    打开并解码图标源文件（同一文件只解码一次，供图标生成和素材复制共用）
+
+    Args:
+        source_path: 源图标路径
+        max_size: 需要生成的最大尺寸，JPEG源文件可据此在解码时直接缩小
+
+    Returns:
+        已解码的图片对象（只读共享，请勿原地修改）
+    """
+    stat = source_path.stat()
+    return _decode_icon(str(source_path), stat.st_mtime_ns, stat.st_size, max_size)
+
+
+@lru_cache(maxsize=4)
+def _decode_icon(
+    path: str, mtime_ns: int, file_size: int, max_size: int
+) -> "Image.Image":
+    """解码图标文件，按路径、修改时间和大小缓存"""
+    img = Image.open(path)
+    # 仅对JPEG生效：解码时按 1/2、1/4、1/8 缩小，保留至少2倍目标尺寸
+    img.draft("RGB", (max_size * 2, max_size * 2))
+    img.load()
+    # 调色板/二值图片无法使用LANCZOS缩放（Pillow会退化为NEAREST），
+    # 解码后一次性转换为RGBA，后续各尺寸缩放直接复用该像素缓冲区
+    if img.mode in ("P", "1"):
+        img = img.convert("RGBA")
+    return img
+
 
 def generate_icon_sizes(
     source_path: Path, output_dir: Path, sizes: List[int] = None
@@ -47,17 +78,18 @@ def generate_icon_sizes(
         raise RuntimeError(f"Icon source file not found: {source_path}")
 
     try:
-        # 打开源图片
-        img = Image.open(source_path)
+        # 从大到小生成：最大尺寸从源图片缩放，较小尺寸从上一级结果缩放
+        sizes = sorted(sizes, reverse=True)
+        img = open_icon(source_path, sizes[0])
 
         # 确保输出目录存在
         output_dir.mkdir(parents=True, exist_ok=True)
 
         # 生成不同尺寸
         for size in sizes:
-            resized = img.resize((size, size), Image.Resampling.LANCZOS)
+            img = img.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
             output_path = output_dir / f"icon{size}.png"
-            resized.save(output_path, "PNG")
+            img.save(output_path, "PNG")
             logger.info(f"Generated: {output_path}")
 
         return True